@@ -8,7 +8,8 @@ from pathlib import Path
 
 def build_extension():
     """Build the extension and return the path to the built binary"""
-    subprocess.check_call([sys.executable, 'setup.py', 'build_ext', '--inplace'])
+    subprocess.check_call([sys.executable, 'setup.py', 'build_ext', '--inplace',
+                           f'-j{os.cpu_count() or 1}'])
     
     # Find the built extension
     ext_suffix = '.so'  # Linux/Mac
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Run a small representative workload to populate PGO counters.
+
+Usage:
+    HICSTRAW_PGO=generate python setup.py build_ext --inplace
+    python scripts/pgo_train.py
+    HICSTRAW_PGO=use python setup.py build_ext --inplace --force
+
+--force on the use pass is required: it makes the build recompile the
+instrumented objects left by the generate pass (the lazy-compile mtime
+check cannot see the flag change), so the final .so comes out optimized
+rather than still carrying the gcov instrumentation.
+
+The workload exercises the hot decode paths (HTTP range reads, zlib
+block decompression, record parsing, normalization vectors) across a
+few resolutions on a small public .hic file.
+"""
+import sys
+
+TRAINING_FILE = 'https://hicfiles.s3.amazonaws.com/hiseq/gm12878/in-situ/HIC001_30.hic'
+RESOLUTIONS = [2500000, 1000000, 500000]
+
+
+def main():
+    import hicstraw
+
+    for resolution in RESOLUTIONS:
+        for norm in ('NONE', 'KR'):
+            try:
+                records = hicstraw.straw('observed', norm, TRAINING_FILE,
+                                         '1', '1', 'BP', resolution)
+                print(f"observed/{norm} @ {resolution}: {len(records)} records")
+            except Exception as e:
+                # KR may be missing at some resolutions; any completed
+                # call still feeds the profile
+                print(f"observed/{norm} @ {resolution} failed: {e}")
+
+    # Matrix path exercises the numpy conversion
+    try:
+        matrix = hicstraw.strawAsMatrix('observed', 'NONE', TRAINING_FILE,
+                                        '1', '2', 'BP', RESOLUTIONS[0])
+        print(f"matrix: {matrix.shape}")
+    except Exception as e:
+        print(f"matrix failed: {e}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
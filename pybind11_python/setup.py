@@ -3,8 +3,12 @@ from setuptools.command.build_ext import build_ext
 import sys
 import setuptools
 import os
+import platform
+import atexit
+import functools
 import warnings
 from distutils import log
+from distutils.ccompiler import CCompiler
 log.set_verbosity(0)
 
 __version__ = '1.3.2'
@@ -35,8 +39,12 @@ class GetPybindInclude(object):
         self.user = user
 
     def __str__(self):
-        import pybind11
-        return pybind11.get_include(self.user)
+        # setuptools stringifies include_dirs repeatedly while expanding
+        # compiler commands; resolve the path once per instance.
+        if not hasattr(self, '_cached'):
+            import pybind11
+            self._cached = pybind11.get_include(self.user)
+        return self._cached
 
 
 ext_modules = [
@@ -46,27 +54,52 @@ ext_modules = [
         include_dirs=[
             # Path to pybind11 headers
             GetPybindInclude(),
-            GetPybindInclude(user=True)
         ],
         language='c++'
     ),
 ]
 
 
+_flag_cache = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _flag_probe_source():
+    """Create the stub source used to probe compiler flags.
+
+    Written once per process and removed at interpreter exit, instead of
+    a fresh NamedTemporaryFile per probe."""
+    import tempfile
+    fd, path = tempfile.mkstemp(suffix='.cpp')
+    with os.fdopen(fd, 'w') as f:
+        f.write('int main (int argc, char **argv) { return 0; }')
+    atexit.register(os.remove, path)
+    return path
+
+
 # As of Python 3.6, CCompiler has a `has_flag` method.
 # cf http://bugs.python.org/issue26689
 def has_flag(compiler, flagname):
     """Return a boolean indicating whether a flag name is supported on
     the specified compiler.
+
+    Each probe costs a full compiler invocation (~100-300ms), so results
+    are memoized per (compiler type, flag) for the process lifetime.
     """
-    import tempfile
-    with tempfile.NamedTemporaryFile('w', suffix='.cpp') as f:
-        f.write('int main (int argc, char **argv) { return 0; }')
+    key = (compiler.compiler_type, flagname)
+    if key not in _flag_cache:
+        # Remove any probe object left by an earlier flag, otherwise the
+        # lazy-compile shortcut below would skip the compile and mask a
+        # CompileError for an unsupported flag.
+        for obj in compiler.object_filenames([_flag_probe_source()]):
+            if os.path.exists(obj):
+                os.remove(obj)
         try:
-            compiler.compile([f.name], extra_postargs=[flagname])
+            compiler.compile([_flag_probe_source()], extra_postargs=[flagname])
+            _flag_cache[key] = True
         except setuptools.distutils.errors.CompileError:
-            return False
-    return True
+            _flag_cache[key] = False
+    return _flag_cache[key]
 
 
 def cpp_flag(compiler):
@@ -86,7 +119,7 @@ def cpp_flag(compiler):
 class BuildExt(build_ext):
     """A custom build extension for adding compiler-specific options."""
     c_opts = {
-        'msvc': ['/EHsc'],
+        'msvc': ['/EHsc', '/MP'],
         'unix': [],
     }
     l_opts = {
@@ -101,6 +134,12 @@ class BuildExt(build_ext):
         l_opts['unix'] += darwin_opts
 
     def build_extensions(self):
+        # Compile translation units in parallel (setuptools thread-pools
+        # CCompiler.compile per source file). MSVC gets /MP instead.
+        if self.parallel is None:
+            self.parallel = int(os.environ.get('HICSTRAW_BUILD_JOBS',
+                                               os.cpu_count() or 1))
+        self._enable_compiler_cache()
         try:
             emit_warning("hic-straw: Attempting to build from source...")
             self._build_extensions_regular()
@@ -120,17 +159,16 @@ Trying pre-built binary..."""
 
 
             emit_warning(message)
-            
-            # Ask user for permission to use pre-built binary
-            try:
-                response = input("\nhic-straw: Would you like to use a pre-built binary instead? [Y/n] ").lower()
-                if response in ('n', 'no'):
-                    emit_warning("hic-straw: User chose not to use pre-built binary")
-                    raise Exception("User chose not to use pre-built binary")
-            except (EOFError, KeyboardInterrupt):
-                # Handle non-interactive environments
-                emit_warning("hic-straw: Non-interactive environment detected, defaulting to Yes")
-                
+
+            # No interactive prompt here: stdin is piped or closed under
+            # pip's isolated build environment, CI runners and Docker, so
+            # asking would hang the install. Fall back to the pre-built
+            # binary by default; set HICSTRAW_NO_PREBUILT=1 to fail hard
+            # on the source build instead.
+            if os.environ.get('HICSTRAW_NO_PREBUILT') == '1':
+                emit_warning("hic-straw: HICSTRAW_NO_PREBUILT=1 set, not using pre-built binary")
+                raise
+
             try:
                 self._use_prebuilt_binary()
                 emit_warning("hic-straw: Successfully installed using pre-built binary")
@@ -141,58 +179,235 @@ Please install the required development packages listed above and try again."""
                 emit_warning(error_message)
                 raise
 
+    def _enable_compiler_cache(self):
+        """Prepend ccache/sccache to the compiler command when available.
+
+        The object cache skips the cc1 stage for unchanged inputs, which
+        dominates rebuilds of straw.cpp (pybind11 header instantiation).
+        Disable with HICSTRAW_NO_CCACHE=1.
+        """
+        import shutil
+        if self.compiler.compiler_type != 'unix':
+            return
+        if os.environ.get('HICSTRAW_NO_CCACHE') == '1':
+            return
+        wrapper = shutil.which('ccache') or shutil.which('sccache')
+        if not wrapper:
+            return
+        # Tolerate compiler symlink shuffles between runs
+        os.environ.setdefault('CCACHE_COMPILERCHECK', 'content')
+        for tool in ('compiler', 'compiler_so', 'compiler_cxx'):
+            cmd = getattr(self.compiler, tool, None)
+            if cmd:
+                self.compiler.set_executable(tool, [wrapper] + list(cmd))
+
+    def _compile_pch(self, opts):
+        """Precompile the third-party headers from src/pch.hpp.
+
+        Parsing the pybind11 template headers dominates the straw.cpp
+        compile time; a .gch lets gcc/clang reuse the parsed AST. The
+        output directory embeds a hash of the compile options, so a flag
+        change invalidates the PCH. Returns the extra options for
+        translation units consuming it, or an empty list when disabled
+        (HICSTRAW_PCH=0) or when the PCH build fails.
+        """
+        import hashlib
+        import shutil
+        if os.environ.get('HICSTRAW_PCH') == '0':
+            return []
+        source = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'src', 'pch.hpp')
+        if not os.path.exists(source):
+            return []
+        # self.include_dirs carries the CPython include path that
+        # build_ext injects for normal compiles; pybind11/pybind11.h
+        # needs it via Python.h.
+        include_dirs = ['-I%s' % d
+                        for d in list(self.include_dirs) +
+                        list(self.extensions[0].include_dirs)]
+        tag = hashlib.sha256('\n'.join(opts + include_dirs).encode()).hexdigest()[:16]
+        pch_dir = os.path.join(self.build_temp, 'pch-%s' % tag)
+        header = os.path.join(pch_dir, 'pch.hpp')
+        gch = header + '.gch'
+        if not os.path.exists(gch):
+            os.makedirs(pch_dir, exist_ok=True)
+            shutil.copy2(source, header)
+            try:
+                self.compiler.spawn(list(self.compiler.compiler_so) +
+                                    include_dirs + opts +
+                                    ['-x', 'c++-header', header, '-o', gch])
+            except Exception as e:
+                emit_warning(f"Precompiled header build failed: {str(e)}")
+                return []
+        # Keep ccache hits stable in the presence of a PCH
+        os.environ.setdefault('CCACHE_SLOPPINESS', 'pch_defines,time_macros')
+        return ['-include', header, '-Winvalid-pch']
+
+    def _link_probe_key(self):
+        """Fingerprint the toolchain and installed curl/zlib for the probe cache."""
+        import glob
+        import hashlib
+        import shutil
+        parts = [shutil.which(self.compiler.compiler[0]) or '']
+        for pattern in ('/usr/lib*/libcurl*', '/usr/lib*/*/libcurl*',
+                        '/usr/lib*/libz*', '/usr/lib*/*/libz*'):
+            for lib in sorted(glob.glob(pattern)):
+                parts.append('%s:%s' % (lib, os.path.getmtime(lib)))
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+    def _probe_link_opts(self):
+        """Determine curl/zlib build options, cached across build_ext runs.
+
+        pkg-config answers in ~10ms; the compile+link fallback costs
+        several compiler/linker forks per build. Either way, when
+        neither the toolchain nor the installed libraries changed since
+        the last run, the cached result is reused. Returns a
+        (compile_opts, link_opts) pair.
+        """
+        import json
+        cache_path = os.path.join(self.build_temp, 'link_probe.json')
+        key = self._link_probe_key()
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if cached.get('key') == key:
+                return cached['opts'], cached['link_opts']
+        except (OSError, KeyError, ValueError):
+            pass
+        probed = self._pkg_config_probe()
+        if probed is None:
+            probed = ([], self._run_link_probe())
+        probe_opts, link_opts = probed
+        os.makedirs(self.build_temp, exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump({'key': key, 'opts': probe_opts,
+                       'link_opts': link_opts}, f)
+        return probe_opts, link_opts
+
+    def _pkg_config_probe(self):
+        """Ask pkg-config for the curl/zlib build flags.
+
+        Only zlib is linked — libcurl is dlopen()ed at runtime, so just
+        its cflags are taken. Returns None when pkg-config is absent or
+        the packages are not registered, in which case the caller falls
+        back to the compile+link probe.
+        """
+        import subprocess
+        try:
+            cflags = subprocess.check_output(
+                ['pkg-config', '--cflags', 'libcurl', 'zlib'],
+                stderr=subprocess.DEVNULL, timeout=2).decode().split()
+            libs = subprocess.check_output(
+                ['pkg-config', '--libs', 'zlib'],
+                stderr=subprocess.DEVNULL, timeout=2).decode().split()
+        except (OSError, subprocess.SubprocessError):
+            return None
+        link_opts = [f for f in libs if f.startswith(('-L', '-l'))]
+        if sys.platform.startswith('linux'):
+            link_opts.append('-ldl')
+        return ([f for f in cflags if f.startswith(('-I', '-D'))], link_opts)
+
+    def _run_link_probe(self):
+        """Compile a stub against the curl headers and link it with libz.
+
+        libcurl itself is loaded with dlopen() at runtime (see
+        src/curl_dl.h), so only its headers are needed at build time.
+        """
+        try:
+            import tempfile
+
+            # Create a test source file
+            with tempfile.NamedTemporaryFile('w', suffix='.cpp') as f:
+                f.write('#include <curl/curl.h>\n#include <zlib.h>\nint main() { return 0; }')
+                f.flush()
+
+                try:
+                    objects = self.compiler.compile([f.name])
+                    self.compiler.link_executable(objects, 'test',
+                                                libraries=['z'],
+                                                library_dirs=['/usr/lib'])
+                except Exception as e:
+                    emit_warning(f"Linking failed: {str(e)}")
+                    raise Exception("Failed to compile against libcurl headers and link with libz")
+            link_opts = ['-lz']
+            if sys.platform.startswith('linux'):
+                link_opts.append('-ldl')
+            return link_opts
+        except Exception as e:
+            emit_warning(f"Compilation test failed: {str(e)}")
+            raise Exception("Failed to compile against libcurl headers and link with libz")
+        finally:
+            # Clean up test executable if it exists
+            if os.path.exists('test'):
+                os.remove('test')
+            # Clean up any object files
+            for obj in os.listdir('.'):
+                if obj.endswith('.o'):
+                    os.remove(obj)
+
     def _build_extensions_regular(self):
         ct = self.compiler.compiler_type
         opts = self.c_opts.get(ct, [])
         link_opts = self.l_opts.get(ct, [])
         if ct == 'unix':
-            # Try static linking first
-            try:
-                import tempfile
-                import os
-                
-                # Create a test source file
-                with tempfile.NamedTemporaryFile('w', suffix='.cpp') as f:
-                    f.write('#include <curl/curl.h>\n#include <zlib.h>\nint main() { return 0; }')
-                    f.flush()
-                    
-                    try:
-                        objects = self.compiler.compile([f.name], 
-                                                      extra_preargs=['-DCURL_STATICLIB', '-DZ_STATICLIB'])
-                        self.compiler.link_executable(objects, 'test',
-                                                    libraries=['curl', 'z'],
-                                                    library_dirs=['/usr/lib'])
-                        link_opts = ['-DCURL_STATICLIB', '-DZ_STATICLIB', '-lcurl', '-lz']
-                    except Exception as e:
-                        emit_warning(f"Static linking failed: {str(e)}")
-                        # Fall back to dynamic linking
-                        try:
-                            objects = self.compiler.compile([f.name])
-                            self.compiler.link_executable(objects, 'test',
-                                                        libraries=['curl', 'z'],
-                                                        library_dirs=['/usr/lib'])
-                            link_opts = ['-lcurl', '-lz']
-                        except Exception as e:
-                            emit_warning(f"Dynamic linking failed: {str(e)}")
-                            raise Exception("Failed to link with libcurl and libz")
-            except Exception as e:
-                emit_warning(f"Compilation test failed: {str(e)}")
-                raise Exception("Failed to link with libcurl and libz")
-            finally:
-                # Clean up test executable if it exists
-                if os.path.exists('test'):
-                    os.remove('test')
-                # Clean up any object files
-                for obj in os.listdir('.'):
-                    if obj.endswith('.o'):
-                        os.remove(obj)
-                
+            probe_opts, link_opts = self._probe_link_opts()
+            opts += probe_opts
             opts.append('-DVERSION_INFO="%s"' % self.distribution.get_version())
             opts.append(cpp_flag(self.compiler))
             if has_flag(self.compiler, '-fvisibility=hidden'):
                 opts.append('-fvisibility=hidden')
+            # Bind intra-library calls directly instead of routing them
+            # through the PLT; nothing interposes hicstraw's internals,
+            # and this frees the compiler to inline them. ELF-only, so
+            # skip it on darwin.
+            if sys.platform.startswith('linux'):
+                if has_flag(self.compiler, '-fno-semantic-interposition'):
+                    opts.append('-fno-semantic-interposition')
+                link_opts.append('-Wl,-Bsymbolic-functions')
+            # Optimization flags: the distutils default is only -O2 with no
+            # -march, so the decompression/parsing loops in straw.cpp never
+            # see AVX2/FMA. x86-64-v3 (Haswell baseline) is the default
+            # target; override it with HICSTRAW_MARCH for older CPUs.
+            machine = platform.machine().lower()
+            if machine in ('x86_64', 'amd64'):
+                arch_flag = '-march=%s' % os.environ.get('HICSTRAW_MARCH', 'x86-64-v3')
+            elif sys.platform == 'darwin' and machine == 'arm64':
+                arch_flag = '-mcpu=apple-m1'
+            else:
+                arch_flag = '-mcpu=native'
+            for flag in ('-O3', '-funroll-loops', arch_flag, '-fno-plt'):
+                if has_flag(self.compiler, flag):
+                    opts.append(flag)
+            # Link-time optimization: lets the linker inline across translation
+            # units (pybind11 dispatchers into straw internals) and drop dead
+            # curl/zlib glue. Roughly doubles link time, so allow CI debug
+            # builds to opt out with HICSTRAW_LTO=0.
+            if os.environ.get('HICSTRAW_LTO', '1') != '0':
+                for flag in ('-flto', '-ffat-lto-objects'):
+                    if has_flag(self.compiler, flag):
+                        opts.append(flag)
+                        if '-flto' not in link_opts:
+                            link_opts.append('-flto')
+            # Profile-guided optimization, driven by HICSTRAW_PGO:
+            # build once with 'generate', run scripts/pgo_train.py to
+            # populate the counters, then rebuild with 'use'.
+            pgo_mode = os.environ.get('HICSTRAW_PGO')
+            pgo_dir = os.environ.get('HICSTRAW_PGO_DIR', './pgo-data')
+            if pgo_mode == 'generate':
+                opts.append('-fprofile-generate=%s' % pgo_dir)
+                link_opts.append('-fprofile-generate=%s' % pgo_dir)
+            elif pgo_mode == 'use':
+                opts.append('-fprofile-use=%s' % pgo_dir)
+                if has_flag(self.compiler, '-fprofile-correction'):
+                    opts.append('-fprofile-correction')
+            # Last, so the PCH is built with the full option set.
+            # MSVC would need /Yc + /Yu wiring and is left out.
+            opts += self._compile_pch(opts)
         elif ct == 'msvc':
             opts.append('/DVERSION_INFO=\\"%s\\"' % self.distribution.get_version())
+            if os.environ.get('HICSTRAW_LTO', '1') != '0':
+                opts.append('/GL')
+                link_opts.append('/LTCG')
         for ext in self.extensions:
             ext.extra_compile_args = opts
             ext.extra_link_args = link_opts
@@ -228,6 +443,31 @@ Please install the required development packages listed above and try again."""
         emit_warning(f"Using pre-built binary: {prebuilt_path}")
 
 
+# setuptools recompiles every source unconditionally, even when the object
+# file is already newer than the source, which makes no-op rebuilds pay the
+# full straw.cpp compile. Filter up-to-date sources out before compiling.
+# Disable with HICSTRAW_LAZY_COMPILE=0 (e.g. after a header-only change).
+_original_compile = CCompiler.compile
+
+
+def lazy_compile(self, sources, output_dir=None, *args, **kwargs):
+    # --force (and anything else setting CCompiler.force) must rebuild
+    # everything, e.g. after a flag-only change the mtimes cannot see.
+    if self.force:
+        return _original_compile(self, sources, output_dir, *args, **kwargs)
+    objects = self.object_filenames(sources, output_dir=output_dir or '')
+    fresh = [s for s, o in zip(sources, objects)
+             if not os.path.exists(o)
+             or os.path.getmtime(s) > os.path.getmtime(o)]
+    if fresh:
+        _original_compile(self, fresh, output_dir, *args, **kwargs)
+    return objects
+
+
+if os.environ.get('HICSTRAW_LAZY_COMPILE', '1') != '0':
+    CCompiler.compile = lazy_compile
+
+
 setup(
     name='hic-straw',
     version=__version__,
@@ -241,7 +481,6 @@ setup(
     long_description_content_type='text/markdown',
     ext_modules=ext_modules,
     install_requires=['pybind11>=2.4'],
-    setup_requires=['pybind11>=2.4'],
     python_requires='>3.3',
     cmdclass={'build_ext': BuildExt},
     zip_safe=False,
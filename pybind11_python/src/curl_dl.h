@@ -0,0 +1,86 @@
+/*
+  Runtime loader for the libcurl entry points straw uses.
+
+  Linking hicstraw.so against libcurl.so at build time ties the binary to
+  the SONAME of the build machine's libcurl, which breaks the module on
+  distros that ship a different one. Instead, resolve the handful of
+  curl_easy_* symbols with dlopen()/dlsym() the first time they are
+  needed; only the curl headers are required at build time.
+
+  The curl_easy_* names are shadowed with macros below, so the calling
+  code in straw.cpp is unchanged.
+*/
+#ifndef STRAW_CURL_DL_H
+#define STRAW_CURL_DL_H
+
+#include <curl/curl.h>
+
+#ifndef _WIN32
+
+#include <dlfcn.h>
+#include <cstdio>
+#include <cstdlib>
+
+namespace strawcurl {
+
+typedef CURL *(*easy_init_t)();
+typedef CURLcode (*easy_setopt_t)(CURL *, CURLoption, ...);
+typedef CURLcode (*easy_perform_t)(CURL *);
+typedef void (*easy_cleanup_t)(CURL *);
+typedef const char *(*easy_strerror_t)(CURLcode);
+
+struct Api {
+    easy_init_t easy_init;
+    easy_setopt_t easy_setopt;
+    easy_perform_t easy_perform;
+    easy_cleanup_t easy_cleanup;
+    easy_strerror_t easy_strerror;
+};
+
+inline void *loadLibcurl() {
+#ifdef __APPLE__
+    const char *names[] = {"libcurl.4.dylib", "libcurl.dylib"};
+#else
+    const char *names[] = {"libcurl.so.4", "libcurl.so"};
+#endif
+    for (const char *name : names) {
+        void *handle = dlopen(name, RTLD_LAZY);
+        if (handle) return handle;
+    }
+    fprintf(stderr, "straw: unable to load libcurl: %s\n", dlerror());
+    exit(2);
+    return nullptr;
+}
+
+inline const Api &api() {
+    static Api loaded = [] {
+        void *handle = loadLibcurl();
+        Api a{};
+        a.easy_init = (easy_init_t) dlsym(handle, "curl_easy_init");
+        a.easy_setopt = (easy_setopt_t) dlsym(handle, "curl_easy_setopt");
+        a.easy_perform = (easy_perform_t) dlsym(handle, "curl_easy_perform");
+        a.easy_cleanup = (easy_cleanup_t) dlsym(handle, "curl_easy_cleanup");
+        a.easy_strerror = (easy_strerror_t) dlsym(handle, "curl_easy_strerror");
+        if (!a.easy_init || !a.easy_setopt || !a.easy_perform
+            || !a.easy_cleanup || !a.easy_strerror) {
+            fprintf(stderr, "straw: libcurl is missing required symbols\n");
+            exit(2);
+        }
+        return a;
+    }();
+    return loaded;
+}
+
+} // namespace strawcurl
+
+// curl.h may have defined curl_easy_setopt as a typecheck macro
+#undef curl_easy_setopt
+#define curl_easy_init (strawcurl::api().easy_init)
+#define curl_easy_setopt (strawcurl::api().easy_setopt)
+#define curl_easy_perform (strawcurl::api().easy_perform)
+#define curl_easy_cleanup (strawcurl::api().easy_cleanup)
+#define curl_easy_strerror (strawcurl::api().easy_strerror)
+
+#endif // _WIN32
+
+#endif // STRAW_CURL_DL_H
@@ -0,0 +1,8 @@
+// Precompiled header for the hicstraw extension build. Only stable
+// third-party headers belong here; straw.h changes with the code and
+// would invalidate the PCH on every edit.
+#include <curl/curl.h>
+#include <zlib.h>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <pybind11/numpy.h>
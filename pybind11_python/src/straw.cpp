@@ -31,7 +31,7 @@
 #include <utility>
 #include <vector>
 #include <streambuf>
-#include <curl/curl.h>
+#include "curl_dl.h"
 #include <iterator>
 #include <algorithm>
 #include "zlib.h"